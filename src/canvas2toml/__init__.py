@@ -3,23 +3,42 @@
 from __future__ import annotations
 
 from pathlib import Path
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable
 import time
+import codecs
 import csv
+import io
 import re
 import math
 import datetime as dt
-import requests
-from urllib.parse import quote
+import shutil
+import tempfile
+from typing import TYPE_CHECKING
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, parse_qsl, quote, urlencode, urlsplit, urlunsplit
 
 try:  # Python 3.11+
     import tomllib
 except ModuleNotFoundError:  # pragma: no cover
     import tomli as tomllib  # type: ignore
 
+if TYPE_CHECKING:  # requests is imported lazily; see _canvas_session
+    import requests
+
 __all__ = ["__version__", "Course"]
 __version__ = "0.1.0"
 
+# Upper bound on concurrent page requests when paginating a collection.
+_MAX_PAGE_WORKERS = 8
+# Connection pool size per host; keep >= the number of concurrent workers.
+_POOL_SIZE = 16
+
+# One entry of a Link header: <url>; rel="name"
+_LINK_RE = re.compile(r'<([^>]+)>;\s*rel="([^"]+)"')
+
+# Student Analysis question headers look like "123456: Prompt text".
+_QCOL_RE = re.compile(r"^\d+:\s+(.*)")
+
 
 def try_int(s):
     s = s.strip()
@@ -31,7 +50,15 @@ def try_int(s):
         except: 
             return 0
 
-def parse_quiz_csv(csv_bytes):
+def try_int_column(values):
+    """Apply ``try_int`` to a whole column, converting all-integer columns in one pass."""
+    try:
+        return list(map(int, values))
+    except ValueError:
+        return [try_int(v) for v in values]
+
+def parse_quiz_csv(csv_data):
+    """Parse a Student Analysis CSV given as bytes or a binary file object."""
     name_col = None
     id_col = None
     sis_id_col = None
@@ -40,7 +67,11 @@ def parse_quiz_csv(csv_bytes):
     q_prompts = []
     max_points = []
 
-    reader = csv.reader(csv_bytes.decode().splitlines())
+    if isinstance(csv_data, (bytes, bytearray)):
+        csv_data = io.BytesIO(csv_data)
+    # Decode line by line rather than materializing the decoded text and a
+    # list of its lines.
+    reader = csv.reader(codecs.iterdecode(csv_data, "utf-8"))
     
     headers = reader.__next__()
     for i, col_name in enumerate(headers):
@@ -53,28 +84,25 @@ def parse_quiz_csv(csv_bytes):
         elif col_name == "submitted":
             submitted_col = i
         else:
-            m = re.match(r"^\d+:\s+(.*)", col_name)
+            m = _QCOL_RE.match(col_name)
             if m: # question column
                 q_col.append(i)
                 q_prompts.append(m.group(1))
                 max_points.append(try_int(headers[i+1]))
     
-    names = []  
-    ids = []
-    sis_ids = []
-    submitted = []
-    answers = [[] for i in range(len(q_col))]
-    points = [[] for i in range(len(q_col))]
-    
-    for row in reader:
-        names.append(row[name_col])
-        ids.append(row[id_col])
-        sis_ids.append(row[sis_id_col])
-        submitted.append(row[submitted_col] if submitted_col is not None else "")
-        for i, q in enumerate(q_col):
-            answers[i].append(row[q])
-            points[i].append(try_int(row[q+1]))
-            
+    # Transpose rows into columns in one pass rather than walking every cell
+    # of every row in Python; each column comes out already at its final size.
+    rows = [row for row in reader if row]
+    columns = list(zip(*rows)) or [()] * len(headers)
+
+    names = list(columns[name_col])
+    ids = list(columns[id_col])
+    sis_ids = list(columns[sis_id_col])
+    submitted = list(columns[submitted_col]) if submitted_col is not None else [""] * len(rows)
+    answers = [list(columns[q]) for q in q_col]
+    points = [try_int_column(columns[q+1]) for q in q_col]
+
+    # Questions that were never scored (all zero) get no points column.
     points = [p if any(p) else None for p in points]
 
     return {
@@ -89,7 +117,6 @@ def parse_quiz_csv(csv_bytes):
     }
     
 import textwrap
-from markdownify import markdownify as md
 # import pd
 
 def name_lf(name):
@@ -98,13 +125,24 @@ def name_lf(name):
         return f"{parts[1]}, {parts[0]}"
     return name
 
+# Backslash and quote escapes plus bare CR -> LF, applied in a single pass.
+_TOML_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\r": "\n"})
+
 def toml_escape_basic(s: str) -> str:
-    s = s.replace("\\", "\\\\").replace('"', '\\"')
-    s = s.replace("\r\n", "\n").replace("\r", "\n")
-    return s
+    if "\r\n" in s:
+        s = s.replace("\r\n", "\n")
+    return s.translate(_TOML_ESCAPES)
+
+_WRAPPER = textwrap.TextWrapper(width=80)
 
 def toml_string(s) -> str:
-    s = '\n'.join(textwrap.fill(p, 80) for p in toml_escape_basic(s).splitlines())
+    s = toml_escape_basic(s)
+    # Short single-line values come back from textwrap unchanged (no tabs,
+    # line breaks or trailing spaces to rewrite), so skip wrapping them.
+    if len(s) <= 80 and s.isprintable() and not s.endswith(" "):
+        return '"' + s + '"'
+
+    s = '\n'.join(_WRAPPER.fill(p) for p in s.splitlines())
 
     if "\n" in s:
         esc = s.replace('"""', '\\"""')
@@ -112,36 +150,38 @@ def toml_string(s) -> str:
     else:
         return '"' + s + '"'
 
-def generate_quiz_toml(quiz_info, student_analysis, prepend_info = {}):
-    tout = ""
+def generate_quiz_toml(quiz_info, student_analysis, prepend_info = {}, name_lf_cache = None):
+    out = []
 
     assignment_id = quiz_info.get("assignment_id") or quiz_info.get("id")
     if assignment_id is not None:
-        tout += f"assignment_id = {assignment_id}\n"
+        out.append(f"assignment_id = {assignment_id}\n")
     
     quiz_id = quiz_info.get("quiz_id") or quiz_info.get("id")
     if quiz_id is not None:
-        tout += f"quiz_id = {quiz_id}\n"
+        out.append(f"quiz_id = {quiz_id}\n")
     
     if 'title' in quiz_info:
-        tout += f"title = {toml_string(quiz_info['title'])}\n"
+        out.append(f"title = {toml_string(quiz_info['title'])}\n")
         
     if 'description' in quiz_info:
-        tout += f"description = {toml_string(md(quiz_info['description']))}\n"
+        from markdownify import markdownify as md
+
+        out.append(f"description = {toml_string(md(quiz_info['description']))}\n")
 
     if 'due_at' in quiz_info and quiz_info['due_at']:
-        tout += f"due_at = {toml_string(quiz_info['due_at'])}\n"
+        out.append(f"due_at = {toml_string(quiz_info['due_at'])}\n")
 
-    tout += "\n"
+    out.append("\n")
     
     for key, value in prepend_info.items():
-        tout += f"{key} = {toml_string(value)}\n"
+        out.append(f"{key} = {toml_string(value)}\n")
 
     for qn, prompt in enumerate(student_analysis['questions']):
-        tout += f"""
+        out.append(f"""
 q{qn+1}_prompt = {toml_string(prompt)}
 q{qn+1}_max_points = {student_analysis['max_points'][qn]}
-"""
+""")
 
     names = student_analysis['names']
     ids = student_analysis['ids']
@@ -150,8 +190,17 @@ q{qn+1}_max_points = {student_analysis['max_points'][qn]}
     points = student_analysis['points']
     submitted = student_analysis.get('submitted') or []
     
-    lf_names = [name_lf(n) for n in names]
-    order = sorted(range(len(names)), key=lambda i: lf_names[i])
+    # The same roster shows up in every quiz, so callers may share a cache.
+    if name_lf_cache is None:
+        name_lf_cache = {}
+    lf_names = []
+    for n in names:
+        lf = name_lf_cache.get(n)
+        if lf is None:
+            lf = name_lf_cache[n] = name_lf(n)
+        lf_names.append(lf)
+    # Sort (name, index) pairs directly; the index keeps ties in CSV order.
+    order = [i for _, i in sorted(zip(lf_names, range(len(names))))]
 
     due_at_raw = quiz_info.get('due_at')
     due_at_dt = None
@@ -172,32 +221,94 @@ q{qn+1}_max_points = {student_analysis['max_points'][qn]}
         except Exception:
             return None
 
+    # Per-question key prefixes are the same for every submission.
+    q_fields = [
+        (f"q{qn+1}_answer = ", f"q{qn+1}_points = " if pts is not None else None, ans, pts)
+        for qn, (ans, pts) in enumerate(zip(answers, points))
+    ]
+    # Multiple-choice answers repeat a lot; only escape/wrap each distinct one once.
+    answer_toml: dict[str, str] = {}
+
     for i in order:
-        tout += f"""
+        out.append(f"""
 [[submission]]
 name = {toml_string(names[i])}
 id = {ids[i]}
 sis_id = {sis_ids[i]}
 
-"""
+""")
         submitted_at_raw = submitted[i] if i < len(submitted) else ""
         submitted_dt = _parse_submitted(submitted_at_raw)
         if submitted_at_raw:
-            tout += f"submitted_at = {toml_string(submitted_at_raw)}\n"
+            out.append(f"submitted_at = {toml_string(submitted_at_raw)}\n")
 
         if due_at_dt and submitted_dt:
             delta = submitted_dt - due_at_dt
             if delta.total_seconds() > 0:
                 days_late = round(delta.total_seconds() / 86400, 2)
-                tout += f"days_late = {days_late:.2f}\n"
-
-        for qn, (ans, pts) in enumerate(zip(answers, points)):
-            tout += f"q{qn+1}_answer = {toml_string(ans[i])}\n"
-            if pts:
-                tout += f"q{qn+1}_points = {pts[i]}\n"
-            tout += "\n"
-
-    return tout
+                out.append(f"days_late = {days_late:.2f}\n")
+
+        for ans_prefix, pts_prefix, ans, pts in q_fields:
+            ans_text = ans[i]
+            ans_str = answer_toml.get(ans_text)
+            if ans_str is None:
+                ans_str = answer_toml[ans_text] = toml_string(ans_text)
+            out.append(ans_prefix + ans_str + "\n")
+            if pts_prefix is not None:
+                out.append(pts_prefix + str(pts[i]) + "\n")
+            out.append("\n")
+
+    return "".join(out)
+
+
+def _is_rate_limited(exc: Exception) -> bool:
+    """Return True if ``exc`` is Canvas throttling a request.
+
+    Canvas answers with ``403 Forbidden (Rate Limit Exceeded)`` rather than
+    429, so the urllib3 retry policy on the session never sees it.
+    """
+    resp = getattr(exc, "response", None)
+    if resp is None or resp.status_code != 403:
+        return False
+    if "rate limit exceeded" in (resp.text or "").lower():
+        return True
+    try:
+        return float(resp.headers.get("X-Rate-Limit-Remaining", "nan")) <= 0
+    except ValueError:
+        return False
+
+
+def _canvas_session(
+    auth: Callable[[requests.PreparedRequest], requests.PreparedRequest],
+) -> requests.Session:
+    """Create a keep-alive session that retries transient Canvas errors.
+
+    Only idempotent reads are retried: a PUT/POST that Canvas already applied
+    (e.g. one posting a comment) must not be resent after a 5xx from a proxy.
+    ``auth`` is called on every request so token changes take effect.
+    """
+    # Imported here so commands that never talk to Canvas (help, hist,
+    # report) don't pay for loading requests/urllib3.
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=_POOL_SIZE,
+        pool_maxsize=_POOL_SIZE,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+            respect_retry_after_header=True,
+        ),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.auth = auth
+    return session
 
 
 class Course:
@@ -231,6 +342,10 @@ class Course:
         self.course_id = course_id
         self.token = token
         self._user_cache: dict[str, int] = {}
+        self._user_cache_warmed = False
+        self._name_lf_cache: dict[str, str] = {}
+        # Shared session so repeated API calls reuse pooled connections.
+        self._session = _canvas_session(self._authorize)
 
     def list_quizzes_and_assignments(self) -> list[dict]:
         """Return quizzes and assignments as dictionaries.
@@ -308,7 +423,7 @@ class Course:
         if not (self.base_url and self.course_id and self.token):
             raise ValueError("base_url, course_id, and token are required.")
         url = self._submission_url(assignment_id, user_id)
-        resp = requests.get(url, headers=self._headers(), timeout=30)
+        resp = self._session.get(url, timeout=30)
         resp.raise_for_status()
         return resp.json()
 
@@ -336,7 +451,7 @@ class Course:
         if group_comment is not None:
             payload["comment[group_comment]"] = bool(group_comment)
 
-        resp = requests.put(url, headers=self._headers(), data=payload, timeout=30)
+        resp = self._session.put(url, data=payload, timeout=30)
         resp.raise_for_status()
         return resp.json()
 
@@ -362,10 +477,79 @@ class Course:
             payload["comment[attempt]"] = attempt
         if group_comment is not None:
             payload["comment[group_comment]"] = bool(group_comment)
-        resp = requests.post(url, headers=self._headers(), data=payload, timeout=30)
+        resp = self._session.post(url, data=payload, timeout=30)
         resp.raise_for_status()
         return resp.json()
 
+    def update_submissions_bulk(
+        self,
+        assignment_id: int | str,
+        grade_map: dict,
+        *,
+        wait: bool = False,
+        poll_interval: float = 2.0,
+        timeout: float = 120.0,
+    ) -> dict:
+        """Update grades and/or comments for many submissions in one request.
+
+        Args:
+            assignment_id: Assignment whose submissions are updated.
+            grade_map: Maps user id (numeric or ``sis_user_id:...``) to a dict
+                with optional ``score`` and ``comment`` keys.
+            wait: If True, poll the returned Progress until Canvas finishes.
+            poll_interval: Maximum seconds between progress checks.
+            timeout: Maximum seconds to wait when ``wait`` is True.
+
+        Returns:
+            The Canvas Progress object for the queued update.
+        """
+        if not (self.base_url and self.course_id and self.token):
+            raise ValueError("base_url, course_id, and token are required.")
+        url = (
+            f"{self.base_url}/api/v1/courses/{self.course_id}"
+            f"/assignments/{quote(str(assignment_id), safe='')}"
+            "/submissions/update_grades"
+        )
+        payload: dict[str, object] = {}
+        for user_id, update in grade_map.items():
+            if update.get("score") is not None:
+                payload[f"grade_data[{user_id}][posted_grade]"] = update["score"]
+            if update.get("comment") is not None:
+                payload[f"grade_data[{user_id}][text_comment]"] = update["comment"]
+        resp = self._session.post(url, data=payload, timeout=60)
+        resp.raise_for_status()
+        progress = resp.json()
+        if wait:
+            progress = self.wait_for_progress(
+                progress, poll_interval=poll_interval, timeout=timeout
+            )
+        return progress
+
+    def wait_for_progress(
+        self,
+        progress: dict,
+        *,
+        poll_interval: float = 2.0,
+        timeout: float = 120.0,
+    ) -> dict:
+        """Poll a Canvas Progress object until it completes or fails."""
+        progress_url = progress.get("url") or (
+            f"{self.base_url}/api/v1/progress/{progress.get('id')}"
+        )
+        start_time = time.time()
+        delay = min(0.25, poll_interval)
+        while progress.get("workflow_state") not in {"completed", "failed"}:
+            if time.time() - start_time > timeout:
+                raise TimeoutError("Timed out waiting for Canvas to finish the update.")
+            time.sleep(delay)
+            delay = min(delay * 2, poll_interval)
+            resp = self._session.get(progress_url, timeout=30)
+            resp.raise_for_status()
+            progress = resp.json()
+        if progress.get("workflow_state") == "failed":
+            raise RuntimeError(f"Canvas bulk update failed: {progress.get('message')}")
+        return progress
+
     def resolve_canvas_user_id(self, user_ref: str) -> int | None:
         """Resolve a user reference (sis_user_id:..., login_id, or numeric id) to Canvas user id.
 
@@ -400,9 +584,27 @@ class Course:
             candidates.append(f"sis_user_id:{ref}")
             candidates.append(f"sis_login_id:{ref}")
 
+        # On the first miss, fill the cache from the course roster with one
+        # paginated request instead of looking every user up individually.
+        if not self._user_cache_warmed:
+            try:
+                self.warm_user_cache()
+            except Exception as exc:
+                if _is_rate_limited(exc):
+                    # Transient: let the caller back off and warm up again.
+                    raise
+                # Roster not readable (e.g. permissions); don't retry every call.
+                self._user_cache_warmed = True
+        for cand in candidates:
+            cached = self._user_cache.get(cand)
+            if cached:
+                self._user_cache[user_ref] = cached
+                return cached
+
+        # Not a student on the roster; look the user up directly.
         for cand in candidates:
             url = f"{self.base_url}/api/v1/users/{quote(cand, safe=':')}"
-            resp = requests.get(url, headers=self._headers(), timeout=15)
+            resp = self._session.get(url, timeout=15)
             if resp.status_code == 404:
                 continue
             resp.raise_for_status()
@@ -412,34 +614,41 @@ class Course:
                 self._user_cache[user_ref] = cid
                 return cid
 
-        # Fallback: scan course users and try to match sis_user_id or login_id.
-        try:
-            users = self._paginate(
-                f"{self.base_url}/api/v1/courses/{self.course_id}/users?enrollment_type[]=student&include[]=sis_user_id&per_page=100"
-            )
-            for u in users:
-                cid = u.get("id")
-                if not cid:
-                    continue
-                sis_uid = u.get("sis_user_id")
-                login_id = u.get("login_id")
-                if sis_uid:
-                    key = f"sis_user_id:{sis_uid}"
-                    self._user_cache[key] = cid
-                if login_id:
-                    key = f"sis_login_id:{login_id}"
-                    self._user_cache[key] = cid
-                # Populate plain ids too
-                self._user_cache[str(cid)] = cid
-
-            cached = self._user_cache.get(user_ref)
-            if cached:
-                return cached
-        except Exception:
-            pass
-
         return None
 
+    def warm_user_cache(self) -> None:
+        """Populate the user id cache from the course's student list.
+
+        A single paginated request maps every student's ``sis_user_id:...``,
+        ``sis_login_id:...`` and numeric id to their Canvas id, so later
+        ``resolve_canvas_user_id`` calls need no per-user requests.
+        """
+        if not (self.base_url and self.course_id and self.token):
+            raise ValueError("base_url, course_id, and token are required.")
+        users = self._paginate(
+            f"{self.base_url}/api/v1/courses/{self.course_id}/users",
+            params={
+                "enrollment_type[]": "student",
+                "include[]": "sis_user_id",
+                "per_page": 100,
+            },
+        )
+        for u in users:
+            cid = u.get("id")
+            if not cid:
+                continue
+            sis_uid = u.get("sis_user_id")
+            login_id = u.get("login_id")
+            if sis_uid:
+                key = f"sis_user_id:{sis_uid}"
+                self._user_cache[key] = cid
+            if login_id:
+                key = f"sis_login_id:{login_id}"
+                self._user_cache[key] = cid
+            # Populate plain ids too
+            self._user_cache[str(cid)] = cid
+        self._user_cache_warmed = True
+
     def _submission_url(self, assignment_id: int | str, user_id: int | str) -> str:
         """Build a safe submission URL, allowing sis_user_id: references."""
         assignment = quote(str(assignment_id).strip(), safe="")
@@ -452,54 +661,109 @@ class Course:
     def download_file(self, url: str, dest: Path) -> None:
         """Download a file to the given destination path."""
         dest.parent.mkdir(parents=True, exist_ok=True)
-        with requests.get(url, headers=self._headers(), stream=True, timeout=60) as r:
+        with self._session.get(url, stream=True, timeout=60) as r:
             r.raise_for_status()
+            r.raw.decode_content = True
             with dest.open("wb") as fh:
-                for chunk in r.iter_content(chunk_size=8192):
-                    if chunk:
-                        fh.write(chunk)
+                shutil.copyfileobj(r.raw, fh, length=1024 * 1024)
 
     def _paginate(self, url: str, params: dict | None = None) -> list[dict]:
-        """Fetch all pages for a Canvas collection endpoint."""
-        results: list[dict] = []
-        first_params = params
+        """Fetch all pages for a Canvas collection endpoint.
+
+        When the first response links to a numbered ``last`` page, the
+        remaining pages are fetched concurrently; otherwise ``next`` links are
+        followed one page at a time.
+        """
+        resp = self._get_page(url, params)
+        results = self._page_items(resp)
+        links = self._parse_link_header(resp.headers.get("Link"))
+
+        page_urls = self._numbered_page_urls(links)
+        if page_urls:
+            with ThreadPoolExecutor(max_workers=_MAX_PAGE_WORKERS) as executor:
+                for page_items in executor.map(
+                    lambda page_url: self._page_items(self._get_page(page_url)),
+                    page_urls,
+                ):
+                    results.extend(page_items)
+            return results
+
+        url = links.get("next")
         while url:
-            resp = requests.get(
-                url, headers=self._headers(), params=first_params, timeout=30
-            )
-            resp.raise_for_status()
-            page_items = resp.json()
-            if isinstance(page_items, dict):
-                # Some endpoints may return dict with 'quizzes' etc.
-                page_items = list(page_items.values())
-            if not isinstance(page_items, Iterable):
-                raise TypeError("Unexpected response structure from Canvas API")
-            results.extend(page_items)
+            resp = self._get_page(url)
+            results.extend(self._page_items(resp))
             url = self._next_link(resp.headers.get("Link"))
-            first_params = None  # only on first request
         return results
 
+    def _get_page(self, url: str, params: dict | None = None) -> requests.Response:
+        resp = self._session.get(url, params=params, timeout=30)
+        resp.raise_for_status()
+        return resp
+
+    @staticmethod
+    def _page_items(resp: requests.Response) -> list[dict]:
+        page_items = resp.json()
+        if isinstance(page_items, dict):
+            # Some endpoints may return dict with 'quizzes' etc.
+            page_items = list(page_items.values())
+        if not isinstance(page_items, Iterable):
+            raise TypeError("Unexpected response structure from Canvas API")
+        return list(page_items)
+
+    @staticmethod
+    def _numbered_page_urls(links: dict[str, str]) -> list[str]:
+        """Return URLs for every page from ``next`` through ``last``.
+
+        Only works for plain numbered pages; Canvas uses opaque bookmarks for
+        some collections, in which case an empty list is returned.
+        """
+        next_url = links.get("next")
+        last_url = links.get("last")
+        if not (next_url and last_url):
+            return []
+
+        def _page_number(page_url: str) -> int | None:
+            page = parse_qs(urlsplit(page_url).query).get("page", [""])[0]
+            return int(page) if page.isdigit() else None
+
+        first_page = _page_number(next_url)
+        last_page = _page_number(last_url)
+        if first_page is None or last_page is None or last_page < first_page:
+            return []
+
+        parts = urlsplit(last_url)
+        query = [
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if key != "page"
+        ]
+        return [
+            urlunsplit(parts._replace(query=urlencode(query + [("page", str(page))])))
+            for page in range(first_page, last_page + 1)
+        ]
+
     def _headers(self) -> dict[str, str]:
         return {"Authorization": f"Bearer {self.token}"}
 
+    def _authorize(self, request: requests.PreparedRequest) -> requests.PreparedRequest:
+        """Session auth hook: attach the current ``token`` to each request."""
+        request.headers.update(self._headers())
+        return request
+
+    @staticmethod
+    def _parse_link_header(link_header: str | None) -> dict[str, str]:
+        """Parse a Canvas-style Link header into a ``{rel: url}`` dict."""
+        links: dict[str, str] = {}
+        if not link_header:
+            return links
+        for url, rel in _LINK_RE.findall(link_header):
+            links.setdefault(rel, url)
+        return links
+
     @staticmethod
     def _next_link(link_header: str | None) -> str | None:
         """Parse Canvas-style Link header for the 'next' rel."""
-        if not link_header:
-            return None
-        for part in link_header.split(","):
-            section = part.strip().split(";")
-            if len(section) < 2:
-                continue
-            url_part, *params = section
-            url = url_part.strip()[1:-1]  # remove <>
-            rel = None
-            for p in params:
-                if "rel=" in p:
-                    rel = p.split("=", 1)[1].strip().strip('"')
-            if rel == "next":
-                return url
-        return None
+        return Course._parse_link_header(link_header).get("next")
 
     # ---- Quiz reports -------------------------------------------------
     def download_quiz_student_analysis(
@@ -514,7 +778,8 @@ class Course:
 
         Args:
             quiz: Quiz ID or quiz dict (must contain ``id``).
-            poll_interval: Seconds between status checks while report is generated.
+            poll_interval: Maximum seconds between status checks while the report
+                is generated; polling starts faster and backs off to this.
             timeout: Maximum seconds to wait for report generation.
 
         Returns:
@@ -531,9 +796,7 @@ class Course:
             f"{self.base_url}/api/v1/courses/{self.course_id}/quizzes/{quiz_id}/reports"
         )
         params = {"quiz_report[report_type]": "student_analysis"}
-        create_resp = requests.post(
-            reports_url, headers=self._headers(), params=params, timeout=30
-        )
+        create_resp = self._session.post(reports_url, params=params, timeout=30)
         create_resp.raise_for_status()
         report = create_resp.json()
 
@@ -547,6 +810,7 @@ class Course:
             return None
 
         file_info = _has_file(report)
+        delay = min(0.25, poll_interval)
         while not file_info:
             if time.time() - start_time > timeout:
                 raise TimeoutError("Timed out waiting for quiz report to be ready.")
@@ -555,22 +819,29 @@ class Course:
                 raise RuntimeError("Report ID missing; cannot poll for completion.")
 
             poll_url = f"{reports_url}/{report_id}"
-            poll_resp = requests.get(poll_url, headers=self._headers(), timeout=30)
+            poll_resp = self._session.get(poll_url, timeout=30)
             poll_resp.raise_for_status()
             report = poll_resp.json()
             file_info = _has_file(report)
             if file_info:
                 break
-            time.sleep(poll_interval)
+            time.sleep(delay)
+            delay = min(delay * 2, poll_interval)
 
         download_url = file_info["url"]
-        download_resp = requests.get(download_url, headers=self._headers(), timeout=60)
-        download_resp.raise_for_status()
-
-        if raw:
-            return download_resp.content
-        else:
-            return parse_quiz_csv(download_resp.content)
+        # Stream the report into a spooled file (rolls over to disk when large)
+        # and parse from there instead of buffering the whole body in memory.
+        with tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024) as buf:
+            with self._session.get(download_url, stream=True, timeout=60) as download_resp:
+                download_resp.raise_for_status()
+                download_resp.raw.decode_content = True
+                shutil.copyfileobj(download_resp.raw, buf)
+            buf.seek(0)
+
+            if raw:
+                return buf.read()
+            else:
+                return parse_quiz_csv(buf)
         
     def generate_quiz_toml(self, quiz_info, prepend_info = {}):
         """Generate a TOML representation of the quiz and student analysis.
@@ -584,7 +855,9 @@ class Course:
         """ 
 
         student_analysis = self.download_quiz_student_analysis(quiz_info)
-        return generate_quiz_toml(quiz_info, student_analysis, prepend_info)
+        return generate_quiz_toml(
+            quiz_info, student_analysis, prepend_info, self._name_lf_cache
+        )
     
     def save_quiz_toml(self, quiz_info, filepath: str | Path, prepend_info = {}):
         """Save the TOML representation of the quiz and student analysis to a file.
@@ -599,3 +872,38 @@ class Course:
         
         with Path(filepath).open("w", encoding="utf-8") as fh:
             fh.write(toml_content)
+
+    def save_all_quiz_tomls(
+        self,
+        quizzes: list[dict],
+        out_dir: str | Path,
+        prepend_info = {},
+        max_workers: int = 4,
+    ) -> list[Path]:
+        """Save TOML for several quizzes, generating their reports concurrently.
+
+        Args:
+            quizzes: Quiz information dicts (each must contain 'id').
+            out_dir: Directory to write ``<quiz_id>.toml`` files into.
+            prepend_info: Additional key-value pairs to prepend to each TOML output.
+            max_workers: Number of quizzes processed at once (at most the
+                connection pool size).
+
+        Returns:
+            Paths of the written files, in the same order as ``quizzes``.
+        """
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        paths = [out_dir / f"{quiz['id']}.toml" for quiz in quizzes]
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, _POOL_SIZE)) as executor:
+            futures = [
+                executor.submit(self.save_quiz_toml, quiz, path, prepend_info)
+                for quiz, path in zip(quizzes, paths)
+            ]
+            for quiz, future in zip(quizzes, futures):
+                try:
+                    future.result()
+                except Exception as exc:
+                    raise RuntimeError(f"Failed to save quiz {quiz['id']}: {exc}") from exc
+        return paths
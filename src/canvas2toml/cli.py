@@ -5,21 +5,64 @@ from __future__ import annotations
 import argparse
 import base64
 import datetime as dt
+import functools
 import io
-import json
 import math
 import re
+import string
 import sys
 import textwrap
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
+from typing import TYPE_CHECKING, TextIO
 
 try:  # Python 3.11+
     import tomllib
 except ModuleNotFoundError:  # pragma: no cover
     import tomli as tomllib  # type: ignore
 
-from . import Course, __version__, toml_string
+from . import Course, __version__, _is_rate_limited, toml_string
 
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
+# Characters allowed in generated filenames.
+_SLUG_CHARS = frozenset(string.ascii_letters + string.digits + "._-")
+# ``bytes.translate`` table for ASCII titles: disallowed bytes become NUL.
+_SLUG_BYTES_TABLE = bytes(b if chr(b) in _SLUG_CHARS else 0 for b in range(256))
+
+
+class _SlugTable(dict):
+    """``str.translate`` table mapping disallowed characters (any code point) to NUL."""
+
+    def __missing__(self, code: int) -> int:
+        self[code] = value = code if chr(code) in _SLUG_CHARS else 0
+        return value
+
+
+_SLUG_TABLE = _SlugTable()
+# Per-question point fields in graded TOML, e.g. ``q3_points``.
+_QN_RE = re.compile(r"^q(\d+)_points$")
+# Bullets indented by four or more spaces (Markdown would read them as code).
+_INDENTED_BULLET_RE = re.compile(r"^ {4,}- ")
+# Single-line comments with no Markdown syntax (e.g. "3/5", "-2 for units");
+# these render to a bare paragraph, so the Markdown parser can be skipped.
+_PLAIN_TEXT_RE = re.compile(
+    r"(?!\d+\.(?:\s|$))(?:[A-Za-z0-9(]|-(?=\d))[A-Za-z0-9 ,;:!?()/'\"%=.-]*(?<! )"
+)
+# Shared stand-in for a missing ``user`` dict; never mutated.
+_EMPTY: dict = {}
+# Concurrent uploads.  Canvas charges each in-flight request against a
+# per-token quota, so keep this small.
+_MAX_UPLOAD_WORKERS = 4
+# Attempts after Canvas throttles a request (delays 1, 2, 4, ... seconds).
+_RATE_LIMIT_RETRIES = 5
+# Concurrent PDF downloads; file hosts tend to throttle beyond this.
+_MAX_DOWNLOAD_WORKERS = 8
 
 GRADING_INFO_BODY = textwrap.dedent(
     """This file is used to auto-upload grades and comments to the Canvas LMS.
@@ -58,7 +101,14 @@ optional comment(s).  For example:
 )
 
 
-def build_parser() -> argparse.ArgumentParser:
+def build_parser(argv: list[str] | None = None) -> argparse.ArgumentParser:
+    """Build the CLI parser.
+
+    When ``argv`` names a subcommand, only that subcommand's parser is
+    constructed; otherwise (no command, ``help``, ``-h`` or an unknown
+    command) every subcommand is added so the full help and error messages
+    are available.
+    """
     parser = argparse.ArgumentParser(
         prog="canvas2toml",
         description="CLI helper for Canvas ↔ TOML utilities.",
@@ -87,7 +137,37 @@ def build_parser() -> argparse.ArgumentParser:
     help_parser = subparsers.add_parser("help", help="Show this help message.")
     help_parser.set_defaults(func=lambda args: parser.print_help())
 
-    # upload ------------------------------------------------------------
+    builders = {
+        "upload": _add_upload_parser,
+        "update": _add_update_parser,
+        "get": _add_get_parser,
+        "hist": _add_hist_parser,
+        "report": _add_report_parser,
+    }
+    command = _first_positional(argv) if argv is not None else None
+    if command in builders:
+        builders[command](subparsers)
+    else:
+        for add_parser in builders.values():
+            add_parser(subparsers)
+
+    # Default to help when no command is provided.
+    parser.set_defaults(func=lambda args: parser.print_help())
+    return parser
+
+
+def _first_positional(argv: list[str]) -> str | None:
+    """Return the subcommand name from ``argv``, skipping top-level options."""
+    args = iter(argv)
+    for arg in args:
+        if arg in {"-c", "--course", "-o", "--output"}:
+            next(args, None)  # skip the option's value
+        elif not arg.startswith("-"):
+            return arg
+    return None
+
+
+def _add_upload_parser(subparsers) -> None:
     upload_parser = subparsers.add_parser(
         "upload", help="Upload scores from a TOML file."
     )
@@ -95,9 +175,15 @@ def build_parser() -> argparse.ArgumentParser:
         "input",
         help="Path to a TOML file containing [[submission]] entries with score/comment.",
     )
+    upload_parser.add_argument(
+        "--sequential",
+        action="store_true",
+        help="Upload one submission at a time (useful for debugging).",
+    )
     upload_parser.set_defaults(func=cmd_upload)
 
-    # update ------------------------------------------------------------
+
+def _add_update_parser(subparsers) -> None:
     update_parser = subparsers.add_parser(
         "update",
         help=(
@@ -116,7 +202,8 @@ def build_parser() -> argparse.ArgumentParser:
     )
     update_parser.set_defaults(func=cmd_get_update)
 
-    # get ---------------------------------------------------------------
+
+def _add_get_parser(subparsers) -> None:
     get_parser = subparsers.add_parser("get", help="Fetch data from Canvas.")
     get_subparsers = get_parser.add_subparsers(dest="get_target")
 
@@ -143,7 +230,8 @@ def build_parser() -> argparse.ArgumentParser:
     )
     quiz_parser.set_defaults(func=cmd_get_quiz)
 
-    # hist --------------------------------------------------------------
+
+def _add_hist_parser(subparsers) -> None:
     hist_parser = subparsers.add_parser(
         "hist",
         help="Generate histograms from a graded TOML file (scores and per-question points).",
@@ -160,7 +248,8 @@ def build_parser() -> argparse.ArgumentParser:
     )
     hist_parser.set_defaults(func=cmd_hist)
 
-    # report -----------------------------------------------------------
+
+def _add_report_parser(subparsers) -> None:
     report_parser = subparsers.add_parser(
         "report",
         help=(
@@ -179,10 +268,6 @@ def build_parser() -> argparse.ArgumentParser:
     )
     report_parser.set_defaults(func=cmd_report)
 
-    # Default to help when no command is provided.
-    parser.set_defaults(func=lambda args: parser.print_help())
-    return parser
-
 
 # ---- helpers ------------------------------------------------------------
 def _validate_course(path: str | Path) -> Course | None:
@@ -230,7 +315,14 @@ def _prompt_choice(items: list[dict], label_key: str) -> dict | None:
 
 def _safe_filename(title: str, suffix: str = "") -> str:
     """Create a filesystem-friendly filename."""
-    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", title).strip("_")
+    if title.isascii():
+        slug = title.encode("ascii").translate(_SLUG_BYTES_TABLE).decode("ascii")
+    else:
+        slug = title.translate(_SLUG_TABLE)
+    if "\0" in slug:
+        # Collapse each run of disallowed characters into a single "_".
+        slug = "_".join(part for part in slug.split("\0") if part)
+    slug = slug.strip("_")
     if not slug:
         slug = "unnamed"
     return f"{slug}{suffix}"
@@ -239,16 +331,15 @@ def _safe_filename(title: str, suffix: str = "") -> str:
 def _current_score_and_comment(sub: dict) -> tuple[float | int | None, str | None]:
     """Extract current score and most recent comment from a submission dict."""
     score = sub.get("score")
-    if score is None:
+    if score is None:  # a score of 0 is a real score
         score = sub.get("entered_score") or sub.get("grade")
 
-    comment_text = None
-    comments = sub.get("submission_comments") or []
-    if isinstance(comments, list) and comments:
-        # Take most recent comment; Canvas returns chronological order.
-        latest = comments[-1]
-        comment_text = latest.get("comment") or latest.get("text_comment")
-    return score, comment_text
+    comments = sub.get("submission_comments")
+    if not comments or not isinstance(comments, list):
+        return score, None
+    # Take most recent comment; Canvas returns chronological order.
+    latest = comments[-1]
+    return score, latest.get("comment") or latest.get("text_comment")
 
 
 def _has_identical_comment(previous: dict, new_comment: str | None) -> bool:
@@ -266,6 +357,25 @@ def _has_identical_comment(previous: dict, new_comment: str | None) -> bool:
     return False
 
 
+def _first_present(
+    sub: dict, user: dict, keys: tuple[str, ...], user_keys: tuple[str, ...] = ()
+):
+    """Return the first truthy ``sub[key]``, then ``user[key]``, like an ``or`` chain.
+
+    As with ``a or b``, the last value looked up is returned if none is truthy.
+    """
+    value = None
+    for key in keys:
+        value = sub.get(key)
+        if value:
+            return value
+    for key in user_keys:
+        value = user.get(key)
+        if value:
+            return value
+    return value
+
+
 def _triple(s: str | None, *, blank_line: bool = False) -> str:
     """Return TOML triple-quoted string literal for the given text (empty allowed).
 
@@ -273,15 +383,37 @@ def _triple(s: str | None, *, blank_line: bool = False) -> str:
     \"\"\"\ntext\n\"\"\" (even when text is empty).
     """
     s = "" if s is None else str(s)
-    s = s.replace('"""', '\\"""')
+    if '"""' in s:
+        s = s.replace('"""', '\\"""')
     if blank_line:
         return f'"""\n{s}\n"""'
     return f'"""{s}"""'
 
 
-def _assignment_to_toml(assignment: dict) -> str:
-    """Serialize a single assignment dict to a lightweight TOML string."""
-    lines: list[str] = [f"grading_info = {_triple(GRADING_INFO_BODY)}"]
+def _is_toml_number(value) -> bool:
+    """Return True for int/float values (bool excluded) written as bare numbers."""
+    return type(value) is int or type(value) is float
+
+
+def _emit_scalar(key: str, value) -> str:
+    """Return a ``key = value`` TOML line (without newline) for a scalar."""
+    if _is_toml_number(value):
+        return f"{key} = {value}"
+    if type(value) is bool:
+        return f"{key} = {'true' if value else 'false'}"
+    return f"{key} = {toml_string(str(value))}"
+
+
+@functools.lru_cache(maxsize=1)
+def _grading_info_line() -> str:
+    """Return the constant ``grading_info = ...`` TOML line, built once."""
+    return f"grading_info = {_triple(GRADING_INFO_BODY)}"
+
+
+def _write_assignment_toml(out: TextIO, assignment: dict) -> None:
+    """Write a single assignment dict as lightweight TOML to ``out``."""
+    write = out.write
+    write(_grading_info_line())
     simple_fields = {
         "assignment_id": assignment.get("id"),
         "title": assignment.get("name"),
@@ -290,35 +422,43 @@ def _assignment_to_toml(assignment: dict) -> str:
         "points_possible": assignment.get("points_possible"),
     }
     for key, value in simple_fields.items():
-        if value is None:
-            continue
-        if isinstance(value, (int, float)) and not isinstance(value, bool):
-            lines.append(f"{key} = {value}")
-        elif isinstance(value, bool):
-            lines.append(f"{key} = {'true' if value else 'false'}")
-        else:
-            lines.append(f"{key} = {toml_string(str(value))}")
+        if value is not None:
+            write(f"\n{_emit_scalar(key, value)}")
 
-    return "\n".join(lines)
+
+@functools.lru_cache(maxsize=1)
+def _markdown_renderer() -> Callable[..., str] | None:
+    """Return ``markdown.markdown``, importing it once; None if unavailable."""
+    try:
+        import markdown  # type: ignore
+    except Exception:
+        return None
+    return markdown.markdown
 
 
 def _markdown_to_html(text: str | None) -> str | None:
     """Convert Markdown to HTML if possible; fall back to original text."""
     if text is None:
         return None
+    return _render_markdown(str(text))
+
+
+@functools.lru_cache(maxsize=256)
+def _render_markdown(raw: str) -> str:
+    """Render one comment string; cached since graders reuse the same comments."""
     # Normalize common four-space-indented bullets (otherwise Markdown treats them as code blocks).
-    raw = str(text)
     lines = raw.splitlines()
-    if any(re.match(r"^ {4,}- ", line) for line in lines):
+    if any(_INDENTED_BULLET_RE.match(line) for line in lines):
         lines = [line[4:] if line.startswith("    ") else line for line in lines]
         raw = "\n".join(lines)
-    try:
-        import markdown  # type: ignore
-    except Exception:
+    render = _markdown_renderer()
+    if render is None or not raw:
         return raw
+    if _PLAIN_TEXT_RE.fullmatch(raw):
+        return f"<p>{raw}</p>"
     try:
         # Use the same options for all conversions (including uploads and reports).
-        return markdown.markdown(
+        return render(
             raw,
             extensions=["extra", "sane_lists", "nl2br"],
             output_format="html5",
@@ -327,7 +467,8 @@ def _markdown_to_html(text: str | None) -> str | None:
         return raw
 
 
-def _submission_block(
+def _write_submission_block(
+    out: TextIO,
     sub: dict,
     file_rel: str | None = None,
     *,
@@ -336,40 +477,34 @@ def _submission_block(
     anon: bool = False,
     submitted_at: str | None = None,
     days_late: int | None = None,
-) -> str:
-    """Create a TOML submission block with placeholders for scoring."""
-    parts: list[str] = ["", "[[submission]]"]
-    user = sub.get("user") or {}
-    name = sub.get("name") or user.get("name")
+) -> None:
+    """Write a TOML submission block with placeholders for scoring to ``out``.
+
+    The block starts with a newline and has no trailing newline.
+    """
+    write = out.write
+    write("\n[[submission]]")
+    user = sub.get("user") or _EMPTY
+    name = _first_present(sub, user, ("name",), ("name",))
     if name and not anon:
-        parts.append(f"name = {toml_string(str(name))}")
-    user_id = sub.get("user_id") or sub.get("id") or user.get("id")
+        write(f"\nname = {toml_string(str(name))}")
+    user_id = _first_present(sub, user, ("user_id", "id"), ("id",))
     if user_id is not None:
-        parts.append(f"id = {user_id}")
-    sis_id = (
-        sub.get("sis_id")
-        or sub.get("sis_user_id")
-        or user.get("sis_user_id")
-        or user.get("sis_login_id")
+        write(f"\nid = {user_id}")
+    sis_id = _first_present(
+        sub, user, ("sis_id", "sis_user_id"), ("sis_user_id", "sis_login_id")
     )
     if sis_id:
-        parts.append(f"sis_id = {toml_string(str(sis_id))}")
+        write(f"\nsis_id = {toml_string(str(sis_id))}")
     if file_rel:
-        parts.append(f'file = "{file_rel}"')
+        write(f'\nfile = "{file_rel}"')
     if submitted_at:
-        parts.append(f"submitted_at = {toml_string(str(submitted_at))}")
+        write(f"\nsubmitted_at = {toml_string(str(submitted_at))}")
     if days_late is not None:
-        parts.append(f"days_late = {days_late:.2f}")
-    if score is None:
-        parts.append("score = 0")
-    else:
-        if isinstance(score, (int, float)) and not isinstance(score, bool):
-            parts.append(f"score = {score}")
-        else:
-            parts.append(f"score = {toml_string(str(score))}")
+        write(f"\ndays_late = {days_late:.2f}")
+    write(f"\n{_emit_scalar('score', 0 if score is None else score)}")
     html_comment = _markdown_to_html(comment)
-    parts.append(f"comment = {_triple(html_comment, blank_line=True)}")
-    return "\n".join(parts)
+    write(f"\ncomment = {_triple(html_comment, blank_line=True)}")
 
 
 # ---- commands -----------------------------------------------------------
@@ -383,7 +518,7 @@ def _timestamp() -> str:
 
 
 def _to_float(val):
-    if isinstance(val, (int, float)) and not isinstance(val, bool):
+    if _is_toml_number(val):
         return float(val)
     try:
         return float(str(val))
@@ -391,17 +526,24 @@ def _to_float(val):
         return None
 
 
-def _write_backup_header(path: Path, data: dict) -> None:
+@contextmanager
+def _open_backup(path: Path, data: dict) -> Iterator[TextIO]:
+    """Open the backup TOML once, write its header and yield the handle.
+
+    Entries are flushed as they are appended (see _append_backup_submission),
+    so the file is not reopened per submission.
+    """
     path.parent.mkdir(parents=True, exist_ok=True)
     header_keys = ("assignment_id", "title", "description")
     with path.open("w", encoding="utf-8") as fh:
         for key in header_keys:
             if key in data and data[key] is not None:
                 fh.write(f"{key} = {toml_string(str(data[key]))}\n")
+        yield fh
 
 
-def _append_backup_submission(path: Path, submission: dict, previous: dict) -> None:
-    """Append a submission backup entry to the backup TOML file."""
+def _append_backup_submission(fh: TextIO, submission: dict, previous: dict) -> None:
+    """Append a submission backup entry to the open backup TOML file."""
     prev_score = (
         previous.get("score")
         or previous.get("entered_score")
@@ -416,22 +558,17 @@ def _append_backup_submission(path: Path, submission: dict, previous: dict) -> N
             prev_comment_parts.append(f"{author}: {text}" if author else text)
     prev_comment = "; ".join(prev_comment_parts) if prev_comment_parts else None
 
-    with path.open("a", encoding="utf-8") as fh:
-        fh.write("\n[[submission]]\n")
-        for key in ("name", "id", "sis_id"):
-            if key in submission and submission[key] is not None:
-                value = submission[key]
-                if isinstance(value, (int, float)) and not isinstance(value, bool):
-                    fh.write(f"{key} = {value}\n")
-                else:
-                    fh.write(f"{key} = {toml_string(str(value))}\n")
-        if prev_score is not None:
-            if isinstance(prev_score, (int, float)) and not isinstance(prev_score, bool):
-                fh.write(f"previous_score = {prev_score}\n")
-            else:
-                fh.write(f"previous_score = {toml_string(str(prev_score))}\n")
-        if prev_comment:
-            fh.write(f"previous_comment = {toml_string(prev_comment)}\n")
+    lines = ["\n[[submission]]\n"]
+    for key in ("name", "id", "sis_id"):
+        if key in submission and submission[key] is not None:
+            lines.append(f"{_emit_scalar(key, submission[key])}\n")
+    if prev_score is not None:
+        lines.append(f"{_emit_scalar('previous_score', prev_score)}\n")
+    if prev_comment:
+        lines.append(f"previous_comment = {toml_string(prev_comment)}\n")
+    fh.write("".join(lines))
+    # Get the previous grade on disk before it is overwritten on Canvas.
+    fh.flush()
 
 
 def _compute_late_deduction(
@@ -472,13 +609,130 @@ def _compute_late_deduction(
     return deduction_points, comment_suffix
 
 
-def _count_valid_submissions(submissions: list[dict]) -> int:
-    return sum(
-        1
-        for sub in submissions
-        if ("score" in sub and sub["score"] is not None)
-        or ("comment" in sub and sub["comment"])
-    )
+def _run_concurrently(func: Callable, items: Iterable, max_workers: int) -> Iterator:
+    """Yield ``func(item)`` for each item, running up to ``max_workers`` at once.
+
+    Results are yielded as they complete.  With ``max_workers <= 1`` the items
+    are processed one at a time, in order, on the calling thread.  If the
+    loop is interrupted, items not yet started are cancelled; those already
+    running are allowed to finish.
+    """
+    items = list(items)
+    max_workers = min(max_workers, len(items))
+    if max_workers <= 1:
+        yield from map(func, items)
+        return
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(func, item) for item in items]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        except BaseException:
+            # On Ctrl-C (or the caller abandoning the results) drop the queued
+            # work instead of letting the pool's exit run all of it.
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+
+
+def _pdf_attachments(sub: dict) -> list[tuple[str, str]]:
+    """Return ``(filename, url)`` for each downloadable PDF attachment, in order."""
+    pdfs = []
+    for att in sub.get("attachments") or []:
+        fname = att.get("filename") or att.get("display_name")
+        if not fname or not fname.lower().endswith(".pdf"):
+            continue
+        url = att.get("url") or att.get("download_url") or att.get("href")
+        if url:
+            pdfs.append((fname, url))
+    return pdfs
+
+
+def _download_pdfs(
+    course: Course,
+    jobs: list[tuple[str, Path, list[tuple[str, str]]]],
+    *,
+    skip_existing: bool,
+    show_progress: bool,
+) -> tuple[dict[str, str], int, int]:
+    """Download one PDF per submission concurrently.
+
+    Each job is ``(uid, dest, candidates)``; candidates are tried in order
+    until one downloads.  Returns ``(file_map, downloaded, existing)`` where
+    ``file_map`` maps uid to the saved file name.
+    """
+
+    def fetch(job) -> tuple[str, Path, str | None, list[str]]:
+        uid, dest, candidates = job
+        errors = []
+        for fname, url in candidates:
+            if skip_existing and dest.exists():
+                return uid, dest, "existing", errors
+            try:
+                course.download_file(url, dest)
+                return uid, dest, "downloaded", errors
+            except Exception as exc:  # pragma: no cover
+                errors.append(f"Failed to download {fname}: {exc}")
+        return uid, dest, None, errors
+
+    file_map: dict[str, str] = {}
+    counts = {"downloaded": 0, "existing": 0}
+    for parent in {dest.parent for _, dest, _ in jobs}:
+        parent.mkdir(parents=True, exist_ok=True)
+    results = _run_concurrently(fetch, jobs, _MAX_DOWNLOAD_WORKERS)
+    for done, (uid, dest, status, errors) in enumerate(results, 1):
+        for message in errors:
+            print(message)
+        if show_progress:
+            print(f"[{done}/{len(jobs)}] {dest.name}")
+        if status is not None:
+            counts[status] += 1
+            file_map[uid] = dest.name
+    return file_map, counts["downloaded"], counts["existing"]
+
+
+def _submission_uid(sub: dict) -> str:
+    """Return the submission's user id as a string ("" if missing); keys ``file_map``."""
+    return str(sub.get("user_id") or sub.get("id") or "")
+
+
+def _sorted_submissions(submissions: list[dict], *, anon: bool) -> list[dict]:
+    """Return submissions sorted by (name, id), or by id alone when anonymizing.
+
+    Sorting strictly by id when anonymizing avoids leaking the name order.
+    Each key is computed once; the original index breaks ties (keeping the
+    sort stable) so the dicts themselves are never compared.
+    """
+    if anon:
+        decorated = [
+            (_submission_uid(sub), i, sub)
+            for i, sub in enumerate(submissions)
+        ]
+    else:
+        decorated = [
+            (
+                (_first_present(sub, sub.get("user") or _EMPTY, ("name",), ("name",)) or "").lower(),
+                _submission_uid(sub),
+                i,
+                sub,
+            )
+            for i, sub in enumerate(submissions)
+        ]
+    decorated.sort()
+    return [d[-1] for d in decorated]
+
+
+def _with_rate_limit_backoff(func: Callable, *args, **kwargs):
+    """Call ``func``, sleeping and retrying with exponential backoff while throttled."""
+    delay = 1.0
+    for _ in range(_RATE_LIMIT_RETRIES):
+        try:
+            return func(*args, **kwargs)
+        except Exception as exc:
+            if not _is_rate_limited(exc):
+                raise
+        time.sleep(delay)
+        delay *= 2
+    return func(*args, **kwargs)
 
 
 def _resolve_user_ref(submission: dict) -> str | None:
@@ -522,32 +776,15 @@ def cmd_upload(args: argparse.Namespace) -> int:
         print("No submissions found in the TOML file.")
         return 1
 
-    valid_count = _count_valid_submissions(submissions)
-    if valid_count == 0:
-        print("No submissions contain score or comment to upload.")
-        return 0
-
-    confirm = input(
-        f"Found {valid_count} submissions with scores/comments to upload. Proceed? [y/N]: "
-    ).strip().lower()
-    if confirm not in {"y", "yes"}:
-        print("Upload cancelled.")
-        return 0
-
-    backup_base = input_path.stem
-    backup_path = input_path.with_name(
-        f"{backup_base}_backup_{_timestamp()}.toml"
-    )
-    _write_backup_header(backup_path, data)
-
-    processed = 0
-    resolved_cache: dict[str, int | str] = {}
-
+    # Collect the uploadable submissions (with any late deduction applied).
+    tasks = []
     for submission in submissions:
         score = submission.get("score")
         comment = submission.get("comment", submission.get("comments"))
+        if score is None and comment is None:
+            continue
         user_ref = _resolve_user_ref(submission)
-        if user_ref is None or (score is None and comment is None):
+        if user_ref is None:
             continue
 
         # Apply late deduction (does not modify the source TOML).
@@ -562,22 +799,61 @@ def cmd_upload(args: argparse.Namespace) -> int:
         upload_comment = comment
         if deduction_suffix is not None:
             upload_comment = (comment or "").rstrip() + deduction_suffix
+        tasks.append((submission, user_ref, upload_score, upload_comment))
+
+    valid_count = len(tasks)
+    if valid_count == 0:
+        print("No submissions contain score or comment to upload.")
+        return 0
+
+    confirm = input(
+        f"Found {valid_count} submissions with scores/comments to upload. Proceed? [y/N]: "
+    ).strip().lower()
+    if confirm not in {"y", "yes"}:
+        print("Upload cancelled.")
+        return 0
+
+    backup_base = input_path.stem
+    backup_path = input_path.with_name(
+        f"{backup_base}_backup_{_timestamp()}.toml"
+    )
 
+    resolved_cache: dict[str, int | str] = {}
+    # User resolution is serialized: after the first roster fetch it is a
+    # cache lookup, and this keeps the roster from being fetched repeatedly.
+    resolve_lock = threading.Lock()
+    backup_lock = threading.Lock()
+
+    def upload_one(task) -> tuple[int | str | None, list[str]]:
+        """Upload one submission; return (user id or None on failure, messages)."""
+        submission, user_ref, upload_score, upload_comment = task
+        messages = []
         try:
-            if user_ref in resolved_cache:
-                resolved_user_id = resolved_cache[user_ref]
-            else:
-                resolved_user_id = course.resolve_canvas_user_id(user_ref) or user_ref
-                resolved_cache[user_ref] = resolved_user_id
-            previous = course.get_submission(assignment_id, resolved_user_id)
-            _append_backup_submission(backup_path, submission, previous)
+            with resolve_lock:
+                if user_ref in resolved_cache:
+                    resolved_user_id = resolved_cache[user_ref]
+                else:
+                    resolved_user_id = (
+                        _with_rate_limit_backoff(course.resolve_canvas_user_id, user_ref)
+                        or user_ref
+                    )
+                    resolved_cache[user_ref] = resolved_user_id
+            previous = _with_rate_limit_backoff(
+                course.get_submission, assignment_id, resolved_user_id
+            )
+            with backup_lock:
+                _append_backup_submission(backup_fh, submission, previous)
             attempt = previous.get("attempt") if isinstance(previous, dict) else None
-            comment_text_raw = None if upload_comment is None else str(upload_comment).rstrip()
-            comment_text = _markdown_to_html(comment_text_raw)
-            # Avoid reposting an identical comment.
-            if _has_identical_comment(previous, comment_text_raw):
-                comment_text = None
-            course.update_submission(
+            if upload_comment is None:
+                comment_text_raw = comment_text = None
+            else:
+                comment_text_raw = str(upload_comment).rstrip()
+                comment_text = _markdown_to_html(comment_text_raw)
+                # Avoid reposting an identical comment.
+                if _has_identical_comment(previous, comment_text_raw):
+                    comment_text = None
+            _with_rate_limit_backoff(
+                course.update_submission,
                 assignment_id,
                 resolved_user_id,
                 score=upload_score,
@@ -586,26 +862,55 @@ def cmd_upload(args: argparse.Namespace) -> int:
             )
             if comment_text is not None:
                 try:
-                    course.add_comment(
+                    _with_rate_limit_backoff(
+                        course.add_comment,
                         assignment_id,
                         resolved_user_id,
                         comment=comment_text,
                         attempt=attempt,
                     )
                 except Exception as exc:
-                    print(f"Warning: comment not posted for user {resolved_user_id}: {exc}")
+                    messages.append(f"Warning: comment not posted for user {resolved_user_id}: {exc}")
             else:
                 if comment_text_raw:
-                    print(f"Skipped duplicate comment for user {resolved_user_id}")
-            processed += 1
-            print(f"[{processed}/{valid_count}] Updated user {resolved_user_id}")
+                    messages.append(f"Skipped duplicate comment for user {resolved_user_id}")
+            return resolved_user_id, messages
         except Exception as exc:  # pragma: no cover - show progress during batch
-            print(f"Failed to update user {user_ref}: {exc}")
+            messages.append(f"Failed to update user {user_ref}: {exc}")
+            return None, messages
+
+    processed = 0
+    max_workers = 1 if args.sequential else _MAX_UPLOAD_WORKERS
+    with _open_backup(backup_path, data) as backup_fh:
+        for resolved_user_id, messages in _run_concurrently(upload_one, tasks, max_workers):
+            for message in messages:
+                print(message)
+            if resolved_user_id is not None:
+                processed += 1
+                print(f"[{processed}/{valid_count}] Updated user {resolved_user_id}")
 
     print(f"Backup of previous scores/comments saved to {backup_path}")
     return 0
 
 
+def _agg_figure_factory() -> Callable[..., Figure]:
+    """Return a function creating matplotlib Figures drawn with the Agg backend.
+
+    Building figures directly (rather than through pyplot) skips GUI backend
+    selection and pyplot's global figure registry; nothing needs closing.
+    Raises ImportError if matplotlib is not installed.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    def new_figure(**kwargs) -> Figure:
+        fig = Figure(**kwargs)
+        FigureCanvasAgg(fig)
+        return fig
+
+    return new_figure
+
+
 def cmd_hist(args: argparse.Namespace) -> int:
     """Generate histograms for total scores and per-question points."""
     data = _load_toml(Path(args.input))
@@ -615,7 +920,7 @@ def cmd_hist(args: argparse.Namespace) -> int:
         return 1
 
     try:
-        import matplotlib.pyplot as plt
+        new_figure = _agg_figure_factory()
     except Exception as exc:  # pragma: no cover - optional dependency
         print(
             "matplotlib is required for this command. Install with 'pip install matplotlib'."
@@ -626,26 +931,29 @@ def cmd_hist(args: argparse.Namespace) -> int:
     out_dir = Path(args.output_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    # Total score histogram
-    scores = [_to_float(sub.get("score")) for sub in submissions]
-    scores = [s for s in scores if s is not None]
-    if not scores:
-        print("No numeric 'score' values found; skipping total score histogram.")
-
-    # Per-question histograms
-    import re as _re
-
+    # Total score and per-question values, gathered in a single pass. Each
+    # distinct key is matched against the qN_points pattern only once.
+    scores: list[float] = []
     question_values: dict[str, list[float]] = {}
+    is_question_key: dict[str, bool] = {}
     for sub in submissions:
+        score = _to_float(sub.get("score"))
+        if score is not None:
+            scores.append(score)
         for key, val in sub.items():
-            m = _re.match(r"^q(\d+)_points$", key)
-            if not m:
+            is_question = is_question_key.get(key)
+            if is_question is None:
+                is_question = is_question_key[key] = _QN_RE.match(key) is not None
+            if not is_question:
                 continue
             v = _to_float(val)
             if v is None:
                 continue
             question_values.setdefault(key, []).append(v)
 
+    if not scores:
+        print("No numeric 'score' values found; skipping total score histogram.")
+
     if not question_values and not scores:
         print("No histogram data found.")
         return 0
@@ -662,7 +970,8 @@ def cmd_hist(args: argparse.Namespace) -> int:
     ncols = 2 if n > 1 else 1
     nrows = (n + ncols - 1) // ncols
 
-    fig, axes = plt.subplots(nrows, ncols, figsize=(6 * ncols, 4 * nrows))
+    fig = new_figure(figsize=(6 * ncols, 4 * nrows))
+    axes = fig.subplots(nrows, ncols)
     if nrows == 1 and ncols == 1:
         axes = [[axes]]
     elif nrows == 1:
@@ -678,11 +987,10 @@ def cmd_hist(args: argparse.Namespace) -> int:
     for ax in [a for row in axes for a in row][len(plots):]:
         ax.axis("off")
 
-    plt.tight_layout()
+    fig.tight_layout()
     base = Path(args.input).stem
     out_file = out_dir / f"{base}_hist.png"
     fig.savefig(out_file)
-    plt.close(fig)
     print(f"Wrote {out_file}")
 
     return 0
@@ -704,7 +1012,7 @@ def cmd_report(args: argparse.Namespace) -> int:
     scores = [s for s in scores if s is not None]
     if scores:
         try:
-            import matplotlib.pyplot as plt
+            new_figure = _agg_figure_factory()
         except Exception as exc:  # pragma: no cover - optional dependency
             print(
                 "matplotlib is required for the histogram. Install with 'pip install matplotlib'."
@@ -712,16 +1020,16 @@ def cmd_report(args: argparse.Namespace) -> int:
             print(f"Import error: {exc}")
             return 1
 
-        fig, ax = plt.subplots(figsize=(7, 4))
+        fig = new_figure(figsize=(7, 4))
+        ax = fig.subplots()
         ax.hist(scores, bins="auto", edgecolor="black", color="#4a90e2")
         ax.set_title("Score Histogram")
         ax.set_xlabel("Score")
         ax.set_ylabel("Count")
-        plt.tight_layout()
+        fig.tight_layout()
 
         buf = io.BytesIO()
         fig.savefig(buf, format="png", bbox_inches="tight")
-        plt.close(fig)
         buf.seek(0)
         histogram_uri = "data:image/png;base64," + base64.b64encode(buf.getvalue()).decode(
             "ascii"
@@ -799,7 +1107,7 @@ def cmd_report(args: argparse.Namespace) -> int:
         if args.output
         else Path(args.input).with_name(f"{Path(args.input).stem}_report.html")
     )
-    out_path.write_text("\n".join(html_parts), encoding="utf-8")
+    out_path.write_bytes("\n".join(html_parts).encode("utf-8"))
     print(f"Wrote report to {out_path}")
     return 0
 
@@ -840,96 +1148,58 @@ def cmd_get_assignments(args: argparse.Namespace) -> int:
     downloaded_count = 0
     existing_count = 0
     if download_pdfs:
-        # Count how many PDFs we expect to handle for a simple progress indicator.
-        pdf_total = 0
-        for sub in submissions:
-            attachments = sub.get("attachments") or []
-            for att in attachments:
-                fname = att.get("filename") or att.get("display_name")
-                if fname and fname.lower().endswith(".pdf") and (
-                    att.get("url") or att.get("download_url") or att.get("href")
-                ):
-                    pdf_total += 1
-                    break  # only first PDF per submission counts toward progress
-
-        pdf_seen = 0
+        # Only the first PDF per submission is kept; later ones are fallbacks
+        # if that download fails.
+        hw_part = _safe_filename(title)
+        jobs = []
         for sub in submissions:
-            attachments = sub.get("attachments") or []
-            if not attachments:
+            candidates = _pdf_attachments(sub)
+            if not candidates:
                 continue
-            user = sub.get("user") or {}
+            user = sub.get("user") or _EMPTY
             student_name = (
-                sub.get("name")
-                or user.get("name")
+                _first_present(sub, user, ("name",), ("name",))
                 or f"student_{sub.get('user_id') or 'unknown'}"
             )
-            student_id = sub.get("user_id") or sub.get("id") or user.get("id")
-            for att in attachments:
-                fname = att.get("filename") or att.get("display_name")
-                if not fname:
-                    continue
-                if not fname.lower().endswith(".pdf"):
-                    continue
-                url = att.get("url") or att.get("download_url") or att.get("href")
-                if not url:
-                    continue
-                pdf_seen += 1
-                sid_part = _safe_filename(str(student_id)) if student_id else _safe_filename(student_name)
-                hw_part = _safe_filename(title)
-                safe_fname = f"{hw_part}_{sid_part}.pdf"
-                dest = submissions_dir / safe_fname
-                if pdf_total:
-                    print(f"[{pdf_seen}/{pdf_total}] {safe_fname}")
-                if skip_existing_pdfs and dest.exists():
-                    existing_count += 1
-                    file_map[str(sub.get("user_id") or sub.get("id") or "")] = dest.name
-                    break  # only first PDF per submission
-                try:
-                    course.download_file(url, dest)
-                    file_map[str(sub.get("user_id") or sub.get("id") or "")] = dest.name
-                    downloaded_count += 1
-                    break  # only first PDF per submission
-                except Exception as exc:  # pragma: no cover
-                    print(f"Failed to download {fname}: {exc}")
+            student_id = _first_present(sub, user, ("user_id", "id"), ("id",))
+            sid_part = _safe_filename(str(student_id)) if student_id else _safe_filename(student_name)
+            dest = submissions_dir / f"{hw_part}_{sid_part}.pdf"
+            jobs.append((_submission_uid(sub), dest, candidates))
+        file_map, downloaded_count, existing_count = _download_pdfs(
+            course, jobs, skip_existing=skip_existing_pdfs, show_progress=True
+        )
         if downloaded_count or existing_count:
             print(
                 f"PDFs: downloaded {downloaded_count}, skipped existing {existing_count}"
             )
 
     # Sort submissions for deterministic TOML output.
-    # When anonymizing, sort strictly by id to avoid leaking name order; otherwise name+id.
-    def _sort_key(sub):
-        user = sub.get("user") or {}
-        name = sub.get("name") or user.get("name") or ""
-        uid = str(sub.get("user_id") or sub.get("id") or "")
-        return (uid,) if args.anon else (name.lower(), uid)
+    sorted_subs = _sorted_submissions(submissions, anon=args.anon)
 
-    sorted_subs = sorted(submissions, key=_sort_key)
-
-    content_parts = [_assignment_to_toml(choice)]
+    buf = io.StringIO()
+    _write_assignment_toml(buf, choice)
+    sub_dir_name = submissions_dir.name
     for sub in sorted_subs:
-        uid = str(sub.get("user_id") or sub.get("id") or "")
-        file_rel = None
-        if uid and uid in file_map:
-            file_rel = f"{submissions_dir.name}/{file_map[uid]}"
+        uid = _submission_uid(sub)
+        file_rel = f"{sub_dir_name}/{file_map[uid]}" if uid and uid in file_map else None
         score, comment = _current_score_and_comment(sub)
-        content_parts.append(
-            _submission_block(
-                sub,
-                file_rel=file_rel,
-                score=score,
-                comment=comment,
-                anon=args.anon,
-                submitted_at=sub.get("submitted_at"),
-                days_late=(
-                    round((dt.datetime.fromisoformat(str(sub.get("submitted_at")).replace("Z", "+00:00")) - due_at_dt).total_seconds() / 86400, 2)
-                    if due_at_dt and sub.get("submitted_at") and dt.datetime.fromisoformat(str(sub.get("submitted_at")).replace("Z", "+00:00")) > due_at_dt
-                    else None
-                ),
-            )
+        buf.write("\n")
+        _write_submission_block(
+            buf,
+            sub,
+            file_rel=file_rel,
+            score=score,
+            comment=comment,
+            anon=args.anon,
+            submitted_at=sub.get("submitted_at"),
+            days_late=(
+                round((dt.datetime.fromisoformat(str(sub.get("submitted_at")).replace("Z", "+00:00")) - due_at_dt).total_seconds() / 86400, 2)
+                if due_at_dt and sub.get("submitted_at") and dt.datetime.fromisoformat(str(sub.get("submitted_at")).replace("Z", "+00:00")) > due_at_dt
+                else None
+            ),
         )
 
-    out_path.write_text("\n".join(content_parts), encoding="utf-8")
+    out_path.write_bytes(buf.getvalue().encode("utf-8"))
     print(f"Saved assignment to {out_path}")
     if submissions_dir.exists():
         print(f"Downloaded PDFs to {submissions_dir}")
@@ -981,7 +1251,7 @@ def cmd_get_update(args: argparse.Namespace) -> int:
                 existing_sis_ids.add(str(sis))
 
     def _already_filed(canvas_sub: dict) -> bool:
-        user = canvas_sub.get("user") or {}
+        user = canvas_sub.get("user") or _EMPTY
         for id_val in (canvas_sub.get("user_id"), user.get("id")):
             if id_val is not None and str(id_val) in existing_ids:
                 return True
@@ -1014,51 +1284,31 @@ def cmd_get_update(args: argparse.Namespace) -> int:
     skip_existing = not args.force_download_pdfs
 
     if download_pdfs:
-        downloaded_count = 0
-        existing_count = 0
+        hw_part = _safe_filename(title)
+        jobs = []
         for sub in new_subs:
-            attachments = sub.get("attachments") or []
-            user = sub.get("user") or {}
-            student_id = sub.get("user_id") or sub.get("id") or user.get("id")
-            for att in attachments:
-                fname = att.get("filename") or att.get("display_name")
-                if not fname or not fname.lower().endswith(".pdf"):
-                    continue
-                url = att.get("url") or att.get("download_url") or att.get("href")
-                if not url:
-                    continue
-                sid_part = _safe_filename(str(student_id)) if student_id else "unknown"
-                safe_fname = f"{_safe_filename(title)}_{sid_part}.pdf"
-                dest = submissions_dir / safe_fname
-                if skip_existing and dest.exists():
-                    existing_count += 1
-                    file_map[str(student_id or "")] = dest.name
-                    break
-                try:
-                    course.download_file(url, dest)
-                    file_map[str(student_id or "")] = dest.name
-                    downloaded_count += 1
-                    break
-                except Exception as exc:  # pragma: no cover
-                    print(f"Failed to download {fname}: {exc}")
+            candidates = _pdf_attachments(sub)
+            if not candidates:
+                continue
+            user = sub.get("user") or _EMPTY
+            student_id = _first_present(sub, user, ("user_id", "id"), ("id",))
+            sid_part = _safe_filename(str(student_id)) if student_id else "unknown"
+            dest = submissions_dir / f"{hw_part}_{sid_part}.pdf"
+            jobs.append((str(student_id or ""), dest, candidates))
+        file_map, downloaded_count, existing_count = _download_pdfs(
+            course, jobs, skip_existing=skip_existing, show_progress=False
+        )
         print(f"PDFs: downloaded {downloaded_count}, skipped existing {existing_count}")
 
     # Sort to match the original download ordering.
-    def _sort_key(sub):
-        user = sub.get("user") or {}
-        name = sub.get("name") or user.get("name") or ""
-        uid = str(sub.get("user_id") or sub.get("id") or "")
-        return (uid,) if anon else (name.lower(), uid)
-
-    new_subs_sorted = sorted(new_subs, key=_sort_key)
+    new_subs_sorted = _sorted_submissions(new_subs, anon=anon)
 
     # Build TOML blocks for each new submission.
-    new_blocks: list[str] = []
-    for sub in new_subs_sorted:
-        uid = str(sub.get("user_id") or sub.get("id") or "")
-        file_rel = None
-        if uid and uid in file_map:
-            file_rel = f"{submissions_dir.name}/{file_map[uid]}"
+    new_blocks = io.StringIO()
+    sub_dir_name = submissions_dir.name
+    for i, sub in enumerate(new_subs_sorted):
+        uid = _submission_uid(sub)
+        file_rel = f"{sub_dir_name}/{file_map[uid]}" if uid and uid in file_map else None
         submitted_at = sub.get("submitted_at")
         days_late = None
         if submitted_at and due_at_dt:
@@ -1071,16 +1321,17 @@ def cmd_get_update(args: argparse.Namespace) -> int:
                     days_late = dl
             except Exception:
                 pass
-        new_blocks.append(
-            _submission_block(
-                sub,
-                file_rel=file_rel,
-                score=None,
-                comment=None,
-                anon=anon,
-                submitted_at=submitted_at,
-                days_late=days_late,
-            )
+        if i:
+            new_blocks.write("\n")
+        _write_submission_block(
+            new_blocks,
+            sub,
+            file_rel=file_rel,
+            score=None,
+            comment=None,
+            anon=anon,
+            submitted_at=submitted_at,
+            days_late=days_late,
         )
 
     # Splice new blocks before the first existing [[submission]] in the raw file.
@@ -1088,11 +1339,11 @@ def cmd_get_update(args: argparse.Namespace) -> int:
     marker = "\n[[submission]]"
     idx = raw.find(marker)
     if idx == -1:
-        updated = raw.rstrip() + "\n" + "\n".join(new_blocks) + "\n"
+        updated = raw.rstrip() + "\n" + new_blocks.getvalue() + "\n"
     else:
-        updated = raw[:idx] + "\n".join(new_blocks) + raw[idx:]
+        updated = raw[:idx] + new_blocks.getvalue() + raw[idx:]
 
-    input_path.write_text(updated, encoding="utf-8")
+    input_path.write_bytes(updated.encode("utf-8"))
     print(f"Prepended {len(new_subs_sorted)} submission(s) to {input_path}")
     return 0
 
@@ -1123,7 +1374,9 @@ def cmd_get_quiz(args: argparse.Namespace) -> int:
 
 
 def main(argv: list[str] | None = None) -> int:
-    parser = build_parser()
+    if argv is None:
+        argv = sys.argv[1:]
+    parser = build_parser(argv)
     args = parser.parse_args(argv)
 
     # When the user runs `canvas2toml` with no args or with `help`,